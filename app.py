@@ -2,8 +2,13 @@ import streamlit as st
 import pandas as pd
 import yfinance as yf
 import os
+import tempfile
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor
+from indicators import latest_indicators
 
 TICKER_FILE = "tickers.txt"  # file to store ticker symbols
+CACHE_FILE = "stock_cache.pkl"  # file to store today's finished table rows
 
 # Read tickers from file
 def load_tickers():
@@ -18,23 +23,132 @@ def save_tickers(tickers):
     with open(TICKER_FILE, "w") as file:
         file.write(",".join(tickers))
 
-# RSI Calculation
-def calculate_rsi(close, period=14):
-    delta = close.diff()
-    gain = delta.where(delta > 0, 0)
-    loss = -delta.where(delta < 0, 0)
-    avg_gain = gain.rolling(window=period).mean()
-    avg_loss = loss.rolling(window=period).mean()
-    rs = avg_gain / avg_loss
-    return 100 - (100 / (1 + rs))
-
-# MACD
-def calculate_macd(close, short=12, long=26, signal=9):
-    ema_short = close.ewm(span=short, adjust=False).mean()
-    ema_long = close.ewm(span=long, adjust=False).mean()
-    macd = ema_short - ema_long
-    signal_line = macd.ewm(span=signal, adjust=False).mean()
-    return macd, signal_line
+# Read rows cached earlier today, keyed by ticker (an unreadable file counts as an empty cache)
+def load_cached_rows(day):
+    if os.path.exists(CACHE_FILE):
+        try:
+            cached = pd.read_pickle(CACHE_FILE)
+            cached = cached[cached["Date"] == day].drop(columns="Date")
+            return {row["Ticker"]: row for row in cached.to_dict("records")}
+        except Exception:
+            pass
+    return {}
+
+# Save today's successfully fetched rows (pickle keeps the mixed number/"N/A" columns as-is);
+# best effort: a failed write is reported, it never takes down the table
+def save_cached_rows(df, day):
+    if "Error" in df:
+        df = df[df["Error"].isna()].drop(columns="Error")
+    try:
+        # Write to a temp file and swap it in, so a reader or another session never sees a half-written file
+        fd, tmp_path = tempfile.mkstemp(prefix=CACHE_FILE + ".", suffix=".tmp", dir=os.path.dirname(os.path.abspath(CACHE_FILE)))
+        try:
+            with os.fdopen(fd, "wb") as file:
+                df.assign(Date=day).to_pickle(file)
+            os.replace(tmp_path, CACHE_FILE)
+        except OSError:
+            os.remove(tmp_path)
+            raise
+    except OSError as e:
+        print(f"Could not update {CACHE_FILE}: {e}")
+
+# Forget every stored row so the next build fetches fresh prices and indicators
+def clear_cached_rows():
+    row_store().clear()
+    try:
+        os.remove(CACHE_FILE)  # the file only ever holds today's rows
+    except OSError:
+        pass
+
+# Fetch quote data for one ticker (blocking network call); the slow full .info
+# scrape is only needed for fundamentals, price and market cap come from fast_info
+def fetch_ticker_info(ticker, need_fundamentals=True):
+    stock = yf.Ticker(ticker)
+    if need_fundamentals:
+        return stock.info
+    fast = stock.fast_info
+    return {"regularMarketPrice": fast["last_price"], "marketCap": fast["market_cap"]}
+
+# Successful rows shared by every session and rerun, keyed by (day, need_fundamentals, need_indicators);
+# failed tickers are never stored, so a rerun only fetches those again
+@st.cache_resource(show_spinner=False)
+def row_store():
+    return {}
+
+# Fetch history and info for the given tickers (the caller keeps only the rows that succeed)
+def fetch_market_data(tickers, need_fundamentals=True, need_indicators=True):
+    # Download 6 months of history for all tickers in one batched request (only needed for indicators);
+    # None means the download failed and every ticker gets an error row
+    history = pd.DataFrame()
+    if need_indicators:
+        try:
+            history = yf.download(list(tickers), period="6mo", interval="1d", group_by="ticker",
+                                  threads=True, progress=False, auto_adjust=True)
+        except Exception:
+            history = None
+
+    # Fetch every ticker's info concurrently; failed tickers are left out
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        futures = {t: executor.submit(fetch_ticker_info, t, need_fundamentals) for t in tickers}
+    infos = {t: f.result() for t, f in futures.items() if f.exception() is None}
+    return history, infos
+
+# Build the results table for the trading day, fetching only tickers without a stored row
+def build_table(tickers, day, need_fundamentals=True, need_indicators=True):
+    store = row_store()
+    for key in [k for k in store if k[0] != day]:
+        del store[key]  # rows from earlier days are never shown again
+    if (day, need_fundamentals, need_indicators) not in store:
+        # Tickers already finished today (e.g. before an app restart) are read back from disk
+        store[(day, need_fundamentals, need_indicators)] = load_cached_rows(day) if need_fundamentals and need_indicators else {}
+    rows = store[(day, need_fundamentals, need_indicators)]
+    full_rows = store.get((day, True, True), {})  # full rows can serve every column choice
+    to_fetch = tuple(t for t in tickers if t not in rows and t not in full_rows)
+    history, infos = fetch_market_data(to_fetch, need_fundamentals, need_indicators) if to_fetch else (pd.DataFrame(), {})
+
+    # Latest RSI/MACD/Signal for every ticker in one call to the shared indicator kernels
+    closes = {t: history[t]["Close"].dropna() for t in to_fetch if history is not None and t in history}
+    closes = {t: close for t, close in closes.items() if not close.empty}
+    latest = dict(zip(closes, latest_indicators(list(closes.values()))))
+
+    for ticker in to_fetch:
+        try:
+            if history is None:
+                raise RuntimeError("price history download failed")
+            info = infos[ticker]
+
+            rsi = macd_val = signal = None
+            if ticker in latest:
+                rsi, macd_val, signal = latest[ticker]
+                rsi = rsi if len(closes[ticker]) > 14 else None
+
+            rows[ticker] = {
+                "Ticker": ticker,
+                "Price": round(info.get("regularMarketPrice", 0), 2),
+                "P/E Ratio": info.get("trailingPE", "N/A"),
+                "Market Cap (B)": round(info.get("marketCap", 0) / 1e9, 2) if info.get("marketCap") else "N/A",
+                "Dividend Yield": info.get("dividendYield", "N/A"),
+                "RSI (14)": round(rsi, 2) if rsi else "N/A",
+                "MACD": round(macd_val, 2) if macd_val else "N/A",
+                "Signal": round(signal, 2) if signal else "N/A",
+            }
+        except:
+            pass  # not stored, so it is retried on the next rerun
+
+    all_data = [rows.get(t) or full_rows.get(t) or {"Ticker": t, "Error": "Failed to fetch"} for t in tickers]
+    df = pd.DataFrame(all_data)
+    if need_fundamentals and need_indicators and any(t in rows for t in to_fetch):
+        save_cached_rows(pd.DataFrame(list(rows.values())), day)  # only full rows are cached, they can serve every column choice
+    if not need_fundamentals:
+        df = df.drop(columns=["P/E Ratio", "Dividend Yield"], errors="ignore")
+    if not need_indicators:
+        df = df.drop(columns=["RSI (14)", "MACD", "Signal"], errors="ignore")
+    return df
+
+# Encode the table as CSV once per result set instead of on every rerun
+@st.cache_data(show_spinner=False)
+def to_csv_bytes(df):
+    return df.to_csv(index=False).encode("utf-8")
 
 st.title("📊 Persistent Stock Dashboard (RSI, MACD, Price Data)")
 
@@ -53,38 +167,19 @@ if st.button("Add Ticker"):
     else:
         st.warning("Ticker already exists.")
 
+# --- P/E ratio and dividend yield need the slower full info download, indicators need price history ---
+need_fundamentals = st.checkbox("Include fundamentals (P/E Ratio, Dividend Yield)", value=True)
+need_indicators = st.checkbox("Include indicators (RSI, MACD, Signal)", value=True)
+
+# --- Rows are reused for the rest of the day; refresh to pull current prices ---
+if st.button("🔄 Refresh Data"):
+    clear_cached_rows()
+
 # --- Automatically fetch stock data when app loads ---
-all_data = []
-for ticker in tickers:
-    try:
-        stock = yf.Ticker(ticker)
-        info = stock.info
-        hist = stock.history(period="6mo")
-
-        rsi = macd_val = signal = None
-        if not hist.empty:
-            close = hist["Close"]
-            rsi = calculate_rsi(close).iloc[-1] if len(close) > 14 else None
-            macd_series, signal_series = calculate_macd(close)
-            macd_val = macd_series.iloc[-1]
-            signal = signal_series.iloc[-1]
-
-        all_data.append({
-            "Ticker": ticker,
-            "Price": round(info.get("regularMarketPrice", 0), 2),
-            "P/E Ratio": info.get("trailingPE", "N/A"),
-            "Market Cap (B)": round(info.get("marketCap", 0) / 1e9, 2) if info.get("marketCap") else "N/A",
-            "Dividend Yield": info.get("dividendYield", "N/A"),
-            "RSI (14)": round(rsi, 2) if rsi else "N/A",
-            "MACD": round(macd_val, 2) if macd_val else "N/A",
-            "Signal": round(signal, 2) if signal else "N/A",
-        })
-    except:
-        all_data.append({"Ticker": ticker, "Error": "Failed to fetch"})
+df = build_table(tuple(tickers), str(date.today()), need_fundamentals, need_indicators)
 
 # Show Table
-df = pd.DataFrame(all_data)
 st.dataframe(df, use_container_width=True)
 
 # Download Button
-st.download_button("⬇ Download CSV", df.to_csv(index=False), "stock_data.csv")
+st.download_button("⬇ Download CSV", to_csv_bytes(df), "stock_data.csv")
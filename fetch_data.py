@@ -2,6 +2,7 @@ import pandas as pd                                                     # Import
 import yfinance as yf                                                   # Import yfinance to fetch stock market data
 import os                                                               # Import os for file and path handling
 import sys                                                              # Import sys to modify Python path for module imports
+from concurrent.futures import ThreadPoolExecutor                       # Import ThreadPoolExecutor to run network requests concurrently
 
 
 # ------✅ Add the scripts directory to Python path------
@@ -11,35 +12,14 @@ if scripts_dir not in sys.path:                                         # Check
     sys.path.append(scripts_dir)                                        # Add it to Python’s module search path
 
 
-# ------✅ Import indicators with fallback------
+# ------✅ Import shared indicator kernels------
 
 try:
-    from indicators import calculate_rsi, calculate_macd                # Try importing custom RSI and MACD functions
+    from indicators import latest_indicators                            # Try importing RSI and MACD kernels from the local module
     print("✅ Imported indicators from local module")
 except ImportError:
-    try:
-        from .indicators import calculate_rsi, calculate_macd           # Alternative import style (relative import if using packages)
-        print("✅ Imported indicators from relative module")
-    except ImportError:
-        print("❌ Could not import indicators module")
-        # Define fallback functions if module not found
-        def calculate_rsi(close_prices, period=14):
-            delta = close_prices.diff()                                 # Price change from previous day
-            gain = delta.where(delta > 0, 0)                            # Positive changes only
-            loss = -delta.where(delta < 0, 0)                           # Negative changes only
-            avg_gain = gain.rolling(window=period).mean()               # Average gain over 'period'
-            avg_loss = loss.rolling(window=period).mean()               # Average loss over 'period'
-            rs = avg_gain / avg_loss                                    # Relative strength (RS)
-            rsi = 100 - (100 / (1 + rs))                                # Final RSI formula
-            return rsi
-
-        def calculate_macd(close_prices, short_window=12, long_window=26, signal_window=9):
-            ema_short = close_prices.ewm(span=short_window, adjust=False).mean()    # 12-day EMA
-            ema_long = close_prices.ewm(span=long_window, adjust=False).mean()      # 26-day EMA
-            macd = ema_short - ema_long                                             # MACD = short EMA - long EMA
-            signal = macd.ewm(span=signal_window, adjust=False).mean()              # Signal line (9-day EMA of MACD)
-            histogram = macd - signal                                               # Difference = histogram
-            return macd, signal, histogram
+    from .indicators import latest_indicators                           # Alternative import style (relative import if using packages)
+    print("✅ Imported indicators from relative module")
 
 
 # ------✅ Read tickers from Excel file------
@@ -55,14 +35,14 @@ def get_tickers_from_excel(excel_path=None, sheet_name="Sheet1"):
         return ["AAPL", "MSFT", "GOOGL", "TSLA", "AMZN"]                            # Return fallback tickers
 
     try:
-        excel_file = pd.ExcelFile(excel_path)                                       # Load Excel file to check sheet names
-        print(f"✅ Available sheets: {excel_file.sheet_names}")
-
-        df = pd.read_excel(excel_path, sheet_name=sheet_name)                       # Read the specified sheet
+        with pd.ExcelFile(excel_path, engine="openpyxl") as excel_file:             # Open the saved file once (read straight from the XML, no running Excel)
+            print(f"✅ Available sheets: {excel_file.sheet_names}")
+            df = excel_file.parse(sheet_name, usecols=[0])                          # Read only the ticker column of the specified sheet
         print(f"✅ Successfully read sheet: {sheet_name}")
         print(f"Columns found: {df.columns.tolist()}")                              # Show columns found in Excel
 
-        tickers = df.iloc[:, 0].dropna().tolist()                                   # Read tickers from first column
+        tickers = [normalize_ticker(t) for t in df.iloc[:, 0].dropna()]             # Read tickers from first column (7203.0 -> "7203", " aapl" -> "AAPL")
+        tickers = [t for t in tickers if t]                                         # Drop cells that were only whitespace
         print(f"✅ Tickers extracted: {tickers}")
         return tickers
 
@@ -71,17 +51,52 @@ def get_tickers_from_excel(excel_path=None, sheet_name="Sheet1"):
         return ["AAPL", "MSFT", "GOOGL", "TSLA", "AMZN"]                            # Return fallback tickers
 
 
+# ------✅ Normalize a ticker cell into the symbol yfinance reports it under------
+def normalize_ticker(value):
+    if isinstance(value, float) and value.is_integer():                             # Excel hands numeric tickers (e.g. 7203) back as floats
+        value = int(value)
+    return str(value).strip().upper()                                               # yf.download upper-cases names, so lookups must match
+
+
+# ------✅ Download price history for all tickers in one batched request------
+def download_history(tickers, period="6mo"):
+    return yf.download(list(tickers), period=period, interval="1d",                 # One threaded request instead of one history() call per ticker
+                       group_by="ticker", threads=True, progress=False,             # Columns grouped as (ticker, field) so each ticker can be sliced out
+                       auto_adjust=True)                                            # Adjusted prices, same as Ticker.history() returns
+
+
+# ------✅ Fetch fundamental info for a single ticker------
+def fetch_ticker_info(ticker):
+    return yf.Ticker(ticker).info                                                   # Blocking HTTPS request, safe to run in a worker thread
+
+
 # ------✅ Fetch data and calculate indicators for each ticker------
-def fetch_stock_data_with_indicators(tickers):
+def fetch_stock_data_with_indicators(tickers, max_workers=16):
     all_data = []                                                                   # List to store data of all stocks
+    tickers = [normalize_ticker(ticker) for ticker in tickers]                      # Same symbols for the download and the column lookups below
+    try:
+        history = download_history(tickers)                                         # Fetch last 6 months historical data for every ticker at once
+    except Exception as e:                                                          # A failed download becomes an error row per ticker below
+        print(f"❌ Error downloading price history: {e}")
+        history = None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:                   # Request every ticker's info concurrently
+        info_futures = {ticker: executor.submit(fetch_ticker_info, ticker) for ticker in tickers}
+
+    closes = {}                                                                     # Close prices of tickers with enough history for RSI & MACD
+    for ticker in tickers:
+        if history is not None and ticker in history:                               # Skip tickers missing from the batched download
+            close_prices = history[ticker]["Close"].dropna()                        # This ticker's closes from the batched download
+            if len(close_prices) > 14:
+                closes[ticker] = close_prices
+    latest = dict(zip(closes, latest_indicators(list(closes.values()))))            # Latest (RSI, MACD, Signal) for all tickers in one parallel call
 
     for ticker in tickers:                                                          # Loop through each ticker
         try:
-            print(f"📊 Fetching data for {ticker}...")
-            stock = yf.Ticker(ticker)                                               # Create a ticker object
-
-            info = stock.info                                                       # Fetch fundamental info
-            hist = stock.history(period="6mo")                                      # Fetch last 6 months historical data
+            print(f"📊 Processing {ticker}...")
+            if history is None:
+                raise RuntimeError("price history download failed")             # Same error row the per-ticker history() loop produced
+            info = info_futures[ticker].result()                                    # Fundamental info (re-raises if this ticker's request failed)
 
             # ✅ Extract key metrics
             current_price = info.get("currentPrice") or info.get("regularMarketPrice")
@@ -89,13 +104,9 @@ def fetch_stock_data_with_indicators(tickers):
             market_cap = info.get("marketCap")
             dividend_yield = info.get("dividendYield")
 
-            # ✅ Calculate RSI & MACD only if history is valid
-            if not hist.empty and len(hist) > 14:
-                close_prices = hist["Close"]
-                rsi = calculate_rsi(close_prices).iloc[-1]                          # Latest RSI value
-                macd, signal, _ = calculate_macd(close_prices)                      # Full MACD calculation
-                macd_value = macd.iloc[-1]
-                signal_value = signal.iloc[-1]
+            # ✅ Use RSI & MACD only if history is valid
+            if ticker in latest:
+                rsi, macd_value, signal_value = latest[ticker]
             else:
                 rsi = macd_value = signal_value = None
 
@@ -1,27 +1,156 @@
+import os
+
+import numpy as np
 import pandas as pd
 
-def calculate_rsi(close_prices, period=14):
-    delta = close_prices.diff()
+# Keep compiled kernels next to this module so every process reuses them
+os.environ.setdefault("NUMBA_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".numba_cache"))
+
+try:
+    from numba import njit, prange
+except ImportError:
+    # numba is optional; without it the kernels below run as plain Python
+    prange = range
+
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+
+def as_close_array(close_prices):
+    # One C-contiguous, writable float64 copy (only if needed) that every kernel can share
+    return np.require(close_prices, np.float64, ["C", "W"])
+
+
+# Explicit signatures compile at import time instead of on the first call
+@njit("f8(f8, f8)", cache=True)
+def _rsi_from_sums(gain_sum, loss_sum):
+    # 100 when there were no losses, NaN when the price did not move, like the pandas division
+    if loss_sum > 0:
+        return 100.0 - 100.0 / (1.0 + gain_sum / loss_sum)
+    if gain_sum > 0:
+        return 100.0
+    return np.nan
 
-    gain = delta.where(delta > 0, 0)
-    loss = -delta.where(delta < 0, 0)
 
-    avg_gain = gain.rolling(window=period).mean()
-    avg_loss = loss.rolling(window=period).mean()
+@njit("f8[::1](f8[::1], i8)", cache=True)
+def _rsi(close, period):
+    # Running sums of gains/losses over the last `period` changes, same as the rolling-mean version
+    rsi = np.full(len(close), np.nan)
+    gain_sum = 0.0
+    loss_sum = 0.0
+    for i in range(1, len(close)):
+        change = close[i] - close[i - 1]
+        if change > 0:
+            gain_sum += change
+        else:
+            loss_sum -= change
 
-    rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
+        if i > period:
+            old_change = close[i - period] - close[i - period - 1]
+            if old_change > 0:
+                gain_sum -= old_change
+            else:
+                loss_sum += old_change
+
+        if i >= period - 1:
+            rsi[i] = _rsi_from_sums(gain_sum, loss_sum)
 
     return rsi
 
 
+def calculate_rsi(close_prices, period=14):
+    close = as_close_array(close_prices)
+    rsi = _rsi(close, period)
+
+    return pd.Series(rsi, index=getattr(close_prices, "index", None))
 
-def calculate_macd(close_prices, short_window=12, long_window=26, signal_window=9):
-    ema_short = close_prices.ewm(span=short_window, adjust=False).mean()
-    ema_long = close_prices.ewm(span=long_window, adjust=False).mean()
 
-    macd = ema_short - ema_long
-    signal = macd.ewm(span=signal_window, adjust=False).mean()
+
+@njit("Tuple((f8[::1], f8[::1]))(f8[::1], i8, i8, i8)", cache=True)
+def _macd(close, short_window, long_window, signal_window):
+    # Same recurrences as Series.ewm(span=..., adjust=False).mean(), all three EMAs in one pass
+    alpha_short = 2.0 / (short_window + 1)
+    alpha_long = 2.0 / (long_window + 1)
+    alpha_signal = 2.0 / (signal_window + 1)
+
+    macd = np.empty_like(close)
+    signal = np.empty_like(close)
+    if len(close) == 0:
+        return macd, signal
+
+    ema_short = close[0]
+    ema_long = close[0]
+    signal_value = 0.0
+    for i in range(len(close)):
+        ema_short += alpha_short * (close[i] - ema_short)
+        ema_long += alpha_long * (close[i] - ema_long)
+        macd[i] = ema_short - ema_long
+        signal_value += alpha_signal * (macd[i] - signal_value)
+        signal[i] = signal_value
+
+    return macd, signal
+
+
+def calculate_macd(close_prices, short_window=12, long_window=26, signal_window=9):
+    close = as_close_array(close_prices)
+    macd, signal = _macd(close, short_window, long_window, signal_window)
     histogram = macd - signal
 
-    return macd, signal, histogram
+    index = getattr(close_prices, "index", None)
+    return (pd.Series(macd, index=index),
+            pd.Series(signal, index=index),
+            pd.Series(histogram, index=index))
+
+
+@njit("UniTuple(f8, 3)(f8[::1], i8, i8, i8, i8)", cache=True)
+def _latest_rsi_macd(close, period, short_window, long_window, signal_window):
+    # Latest RSI (sum of the last `period` changes) and MACD/signal (the _macd recurrences) in one pass over the closes
+    if len(close) == 0:
+        return np.nan, np.nan, np.nan
+
+    alpha_short = 2.0 / (short_window + 1)
+    alpha_long = 2.0 / (long_window + 1)
+    alpha_signal = 2.0 / (signal_window + 1)
+    rsi_start = max(len(close) - period, 1)
+
+    ema_short = close[0]
+    ema_long = close[0]
+    macd = 0.0
+    signal = 0.0
+    gain_sum = 0.0
+    loss_sum = 0.0
+    for i in range(len(close)):
+        ema_short += alpha_short * (close[i] - ema_short)
+        ema_long += alpha_long * (close[i] - ema_long)
+        macd = ema_short - ema_long
+        signal += alpha_signal * (macd - signal)
+
+        if i >= rsi_start:
+            change = close[i] - close[i - 1]
+            if change > 0:
+                gain_sum += change
+            else:
+                loss_sum -= change
+
+    rsi = _rsi_from_sums(gain_sum, loss_sum) if len(close) >= period else np.nan
+    return rsi, macd, signal
+
+
+@njit("f8[:, ::1](f8[::1], i8[::1], i8, i8, i8, i8)", parallel=True, cache=True)
+def _latest_indicators(values, offsets, period, short_window, long_window, signal_window):
+    # Ticker i's closes are values[offsets[i]:offsets[i + 1]]; tickers are independent so run them in parallel
+    out = np.empty((len(offsets) - 1, 3))
+    for i in prange(len(offsets) - 1):
+        close = values[offsets[i]:offsets[i + 1]]
+        out[i, 0], out[i, 1], out[i, 2] = _latest_rsi_macd(close, period, short_window, long_window, signal_window)
+    return out
+
+
+def latest_indicators(close_arrays, period=14, short_window=12, long_window=26, signal_window=9):
+    # Latest [rsi, macd, signal] for each close array, one row per array
+    offsets = np.zeros(len(close_arrays) + 1, dtype=np.int64)
+    np.cumsum([len(close) for close in close_arrays], out=offsets[1:])
+    values = as_close_array(np.concatenate(close_arrays)) if close_arrays else np.empty(0)
+    return _latest_indicators(values, offsets, period, short_window, long_window, signal_window)
@@ -1,14 +1,17 @@
 import sys                                                      # Built-in module: lets us access and modify Python runtime settings (like sys.path)
 import os                                                       # Built-in module: work with file paths, directories, environment
-import xlwings as xw                                            # xlwings: control Excel from Python (read/write/format workbooks)
+import hashlib                                                  # Built-in module: hash the ticker list into a cache key
+import logging                                                  # Built-in module: report failures with their traceback
+import tempfile                                                 # Built-in module: temp file for atomic cache writes
+import time                                                     # Built-in module: age of the cached data file
+from datetime import date                                       # Built-in module: today's date, so cached data expires daily
 import pandas as pd                                             # pandas: DataFrame handling for tabular data
+import numpy as np                                              # numpy: vectorized text-length math for column widths
 
+log = logging.getLogger(__name__)                               # Module logger; errors reach stderr even when logging isn't configured
+CACHE_MAX_AGE = 15 * 60                                         # Seconds fetched data is reused; prices and the last bar move during market hours
 
 
-# ------✅ Display settings for clean DataFrame in terminal------
-pd.set_option('display.max_columns', None)                      # Show all columns when printing DataFrames (no truncation)
-pd.set_option('display.width', None)                            # Let pandas use full terminal width (prevents wrapping)
-
 
 # ------✅ Add project root and scripts directory to Python path------
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))       #Get absolute path to the project root: start at this file's folder, then go one level up
@@ -20,37 +23,63 @@ if scripts_dir not in sys.path:
     sys.path.append(scripts_dir)                                                    # ...add it too
 
 try:
-    from fetch_data import fetch_stock_data_with_indicators, get_tickers_from_excel #Try importing the two helper functions from fetch_data.py (expected to be in project root or scripts)
+    from fetch_data import fetch_stock_data_with_indicators, get_tickers_from_excel, normalize_ticker #Try importing the helper functions from fetch_data.py (expected to be in project root or scripts)
     print("✅ Successfully imported fetch_data functions")
 except ImportError:                                                                 #If the import fails (wrong path/name), handle gracefully
     print("❌ Could not import fetch_data. Check file location/import path.")
     sys.exit()                                                                      # Exit the program since we can't continue without these functions
 
-def format_excel(sheet):
-    """ ✅ Apply Excel Formatting: header, autofit, borders, freeze pane, alignment """
+def save_cached_data(df, cache_path, day):
+    """ ✅ Save fetched data atomically (temp file + rename) and delete cache files from earlier days """
+    cache_dir = os.path.dirname(cache_path)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=cache_dir)               # Same directory, so os.replace is a plain rename
+        try:
+            with os.fdopen(fd, "wb") as file:
+                df.to_pickle(file)                                                  # Pickle keeps the mixed number/"N/A" columns exactly as fetched
+            os.replace(tmp_path, cache_path)                                        # Readers see either the old file or the complete new one
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+        for name in os.listdir(cache_dir):                                          # Files are named <key>_<date>.pkl; only today's are still usable
+            if name.endswith(".pkl") and not name.endswith(f"_{day}.pkl"):
+                os.remove(os.path.join(cache_dir, name))
+    except OSError as e:                                                            # A cache problem shouldn't stop the Excel update
+        print(f"⚠️ Could not update stock data cache: {e}")
+
+
+def compute_column_widths(values, max_width=50):
+    """ ✅ Column widths (in characters) from the values being written, so Excel doesn't have to measure every cell """
+    cells = np.where(pd.isna(values), "", values).astype(str)                       # Every written cell as text, header row included (empty cells -> "")
+    widths = np.char.str_len(cells).max(axis=0) + 2                                 # Longest text in each column, plus padding
+    return np.minimum(widths, max_width).tolist()                                   # Cap very long text columns
+
+
+def format_excel(sheet, nrows, ncols, column_widths):
+    """ ✅ Apply Excel Formatting: header, column widths, borders, freeze pane, alignment """
     print("🎨 Applying Excel formatting...")
     
     # Header Range
-    header = sheet.range("A1").expand("right")                                      # Select header row starting at A1 and expanding to the last used column (first row only)
+    header = sheet.range((1, 1), (1, ncols))                                        # Header row from A1 across every written column (first row only)
     header.api.Font.Bold = True                                                     # Make header text bold via Excel COM API
     header.api.Interior.Color = 0xD9E1F2                                            # Fill header background with a light blue color (BGR integer)
 
     # All Data Range (Body + Header)
-    last_row = sheet.range("A1").expand("down").last_cell.row                       # Find the last used row by expanding downward from A1 and reading the last cell's row index
-    last_col = sheet.range("A1").expand("right").last_cell.column                   # Find the last used column by expanding rightward from A1 and reading the last cell's column index
-    used_range = sheet.range((1, 1), (last_row, last_col))                          # Create a range covering the full used area from A1 to bottom-right cell
+    used_range = sheet.range((1, 1), (nrows, ncols))                                # The block just written, from A1 to its bottom-right cell (no expand() probes)
     
 
     # Borders Around All Cells
-    for border_id in range(7, 13):                                                  # Excel's border ids 7..12 map to edges/inside borders (xlEdgeLeft=7 ... xlInsideHorizontal=12)
-        used_range.api.Borders(border_id).LineStyle = 1                             # Set each border line style to continuous (xlContinuous=1)
+    used_range.api.Borders.LineStyle = 1                                            # Continuous line (xlContinuous=1) on every edge and inside border in one COM call
 
     # Center Align
     used_range.api.HorizontalAlignment = -4108                                      # Center text horizontally (xlCenter = -4108)
     
 
-    # Auto-fit Columns
-    sheet.range("A1").expand().columns.autofit()                                    # Auto-fit all columns in the contiguous used block starting at A1
+    # Column Widths
+    for col, width in enumerate(column_widths, start=1):                            # Pre-computed widths instead of Excel's cell-by-cell autofit
+        sheet.range((1, col)).column_width = width
     
 
     # Freeze Top Header Row
@@ -61,7 +90,7 @@ def format_excel(sheet):
 
 
 
-def update_excel():
+def update_excel(use_cache=True, max_age=CACHE_MAX_AGE):
     try:
         print("🔄 Starting Excel update process...")
         base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))   # Resolve the absolute path to the project base directory (one level above this script)
@@ -72,16 +101,17 @@ def update_excel():
             print(f"❌ dashboard.xlsm not found!")
             return False
 
+        import xlwings as xw                                                        # xlwings: control Excel from Python; imported here so the early returns above skip the COM setup
         app = xw.apps.active                                                        # Get the currently running Excel instance (if any)
         if app is None:                                                             # If Excel isn't open, we prefer the user to open it first (or we could open it ourselves)
             print("❌ No active Excel instance detected. Please open the Excel file first.")
             return False
 
         # Find the opened Excel workbook
-        workbook = None
-        for wb in app.books:                                                        # Iterate over all open workbooks in the active Excel app
-            if "dashboard.xlsm" in wb.name:                                         # Match by filename; if found, keep a reference
-                workbook = wb
+        books = {os.path.normcase(wb.fullname): wb for wb in app.books}             # Open workbooks keyed by their full path (one pass over app.books)
+        workbook = books.get(os.path.normcase(excel_path))                          # Exact match on this workbook's path; None if it isn't open
+        if workbook is None:                                                        # Excel may report another form of the path (OneDrive URL, UNC, 8.3 name)
+            workbook = next((wb for wb in books.values() if wb.name == "dashboard.xlsm"), None)  # Same-named book must be reused: Excel can't open two
 
         if workbook is None:                                                        # If workbook isn't already open, open it now
             print("⚠️ Workbook is not open. Opening it now...")
@@ -94,34 +124,92 @@ def update_excel():
 
         # ✅ Read tickers from Sheet1
         print("📊 Fetching tickers from Sheet1...")
-        tickers = get_tickers_from_excel(sheet_name="Sheet1")                       # Use helper to read tickers from the first column of the "Sheet1" sheet
+        if workbook.api.Saved:                                                      # Saved copy on disk matches the open workbook
+            tickers = get_tickers_from_excel(excel_path, sheet_name="Sheet1")       # Read the first column of "Sheet1" from the file, no COM traffic
+        else:                                                                       # Unsaved edits only exist in the running Excel
+            try:
+                ticker_sheet = workbook.sheets["Sheet1"]
+                last_row = ticker_sheet.used_range.last_cell.row                    # Whole first column down to the last used row, gaps included
+                column = ticker_sheet.range((1, 1), (last_row, 1)).options(ndim=1).value
+                tickers = [normalize_ticker(t) for t in column[1:] if t is not None]  # Skip the header and blanks, same cleanup as the file read
+                tickers = [t for t in tickers if t]
+            except Exception as e:                                                  # Fall back to the saved copy (which has its own fallback tickers)
+                print(f"❌ Error reading tickers from the open workbook: {e}")
+                tickers = get_tickers_from_excel(excel_path, sheet_name="Sheet1")
         print("✅ Tickers found:", tickers)
 
-        # ✅ Fetch stock data
-        print("📈 Fetching stock data...")
-        df = fetch_stock_data_with_indicators(tickers)                              # Download yfinance data + compute indicators (RSI, MACD) → return a DataFrame
+        # ✅ Fetch stock data (reused from a cache younger than max_age when the ticker list is unchanged; use_cache=False forces a fetch)
+        cache_key = hashlib.sha256(",".join(map(str, tickers)).encode()).hexdigest()[:16]
+        today = date.today().isoformat()
+        cache_path = os.path.join(base_dir, ".cache", f"{cache_key}_{today}.pkl")
+        df = None
+        if (use_cache and os.path.exists(cache_path)                                # Same tickers already fetched today...
+                and time.time() - os.path.getmtime(cache_path) < max_age):          # ...recently enough that prices are still current
+            try:
+                df = pd.read_pickle(cache_path)
+                print(f"📦 Using cached stock data: {cache_path}")
+            except Exception as e:                                                  # Unreadable cache file: fetch again and overwrite it
+                print(f"⚠️ Ignoring unreadable cache file {cache_path}: {e}")
+        if df is None:
+            print("📈 Fetching stock data...")
+            df = fetch_stock_data_with_indicators(tickers)                          # Download yfinance data + compute indicators (RSI, MACD) → return a DataFrame
+            if not (df == "Error").any().any():                                     # Only cache complete results so failed tickers are retried next run
+                save_cached_data(df, cache_path, today)
 
         # print("\n📄 Data Preview:")                                               # Pretty-printed DataFrame in terminal (using earlier pd.set_option settings)
         # print(df)  
 
-        # ✅ Clear and write data to RawData sheet
-        print("💾 Writing data to RawData sheet...")
-        sheet.clear()                                                               # Clear the entire sheet to remove old content/formatting
-        sheet.range("A1").value = df                                                # Write the DataFrame starting at cell A1 (headers + data)
-
-        # ✅ Apply formatting
-        format_excel(sheet)                                                         # Call our formatter to style the sheet (headers, borders, freeze, autofit)
+        # ✅ Pause redraws, recalculation and event macros while writing
+        previous_state = (app.screen_updating, app.calculation, app.enable_events)  # Remember the user's settings so they can be restored
+        app.screen_updating = False                                                 # Don't redraw the window after every change
+        app.calculation = "manual"                                                  # Don't recalculate formulas after every change
+        app.enable_events = False                                                   # Don't fire workbook/sheet event handlers while writing
+        try:
+            # ✅ Clear and write data to RawData sheet
+            print("💾 Writing data to RawData sheet...")
+            last_cell = sheet.used_range.last_cell                                  # Extent of the previous write (instead of clearing the whole sheet)
+            old_rows, old_cols = last_cell.row, last_cell.column
+            values = np.vstack([                                                    # Materialize the sheet contents once; shared by the write and the column widths
+                np.array([df.index.name] + list(df.columns), dtype=object),         # Header row; column A holds the index, as xlwings' DataFrame converter wrote it
+                df.reset_index().to_numpy(dtype=object, na_value=None),             # Data rows as plain Python values (NaN -> empty cell)
+            ])
+            nrows, ncols = values.shape
+            sheet.range((1, 1), (nrows, ncols)).value = values.tolist()             # Overwrite everything from A1 as one 2D array in a single COM call
+
+            if old_rows > nrows:                                                    # Clear only the old rows/columns the new data no longer covers
+                sheet.range((nrows + 1, 1), (old_rows, max(old_cols, ncols))).clear()
+            if old_cols > ncols:
+                sheet.range((1, ncols + 1), (nrows, old_cols)).clear()
+
+            # ✅ Apply formatting (skipped when the layout matches the last formatted write)
+            column_widths = compute_column_widths(values)
+            layout = f"{nrows}|{ncols}|{values[0].tolist()}|{column_widths}"       # Everything format_excel depends on: block size, headers, widths
+            format_sig = hashlib.sha256(layout.encode()).hexdigest()[:16]
+            try:
+                last_sig = workbook.api.Names("_fmt_sig").RefersTo                  # Stored as ="<sig>"; missing until the first formatted run
+            except Exception:
+                last_sig = None
+            if last_sig == f'="{format_sig}"':
+                print("🎨 Layout unchanged, keeping existing formatting")
+            else:
+                format_excel(sheet, nrows, ncols, column_widths)                    # Call our formatter to style the sheet (headers, widths, borders, freeze)
+                workbook.api.Names.Add("_fmt_sig", f'="{format_sig}"', False)       # Remember the layout in a hidden workbook name
+        finally:
+            app.screen_updating, app.calculation, app.enable_events = previous_state
+            app.calculate()                                                         # One recalculation with the new data in place
 
         print("✅ Excel updated successfully!")                                    # Indicate success to the caller
         return True
         
 
-    except Exception as e:                                                          # Catch any runtime errors and print a helpful trace
-        print(f"❌ Error in update_excel: {e}")
-        import traceback
-        traceback.print_exc()
+    except Exception:                                                               # Catch any runtime errors and log them with a helpful trace
+        log.exception("❌ Error in update_excel")
         return False                                                                # Indicate failure to the caller
         
 
 if __name__ == "__main__":
+    # ------✅ Display settings for clean DataFrame in terminal (only when run as a script, not on import)------
+    pd.set_option('display.max_columns', None)                                      # Show all columns when printing DataFrames (no truncation)
+    pd.set_option('display.width', None)                                            # Let pandas use full terminal width (prevents wrapping)
+
     update_excel()                                                                  # If this script is run directly (not imported), execute the update workflow
\ No newline at end of file